@@ -4,6 +4,9 @@ from datetime import datetime
 import psycopg2
 from psycopg2 import sql
 
+LOAD_BATCH_SIZE = 200
+EXACT_COUNT_LIMIT = 10000
+
 class Database:
     def __init__(self):
         try:
@@ -13,6 +16,14 @@ class Database:
                 port="5432"
             )
             self.cursor = self.connection.cursor()
+            self.load_connection = psycopg2.connect(
+                dbname="postgres",
+                host="localhost",
+                port="5432"
+            )
+            self.count_cache = {}
+            self.lookup_cache = {}
+            self.label_cache = {}
         except psycopg2.OperationalError as e:
             messagebox.showerror("Ошибка подключения", f"Не удалось подключиться к базе данных:\n{str(e)}")
             raise
@@ -34,26 +45,152 @@ class Database:
             messagebox.showerror("Ошибка запроса", f"Ошибка при получении данных из таблицы {table}:\n{str(e)}")
             return []
 
+    def _run_loader_step(self, step):
+        with self.load_connection.cursor() as cursor:
+            cursor.execute("SAVEPOINT loader_step")
+            try:
+                result = step()
+            except psycopg2.Error:
+                cursor.execute("ROLLBACK TO SAVEPOINT loader_step")
+                raise
+            cursor.execute("RELEASE SAVEPOINT loader_step")
+        return result
+
+    def open_loader(self, name, query, params):
+        cursor = self.load_connection.cursor(name=name)
+        self._run_loader_step(lambda: cursor.execute(query, params))
+        return cursor
+
+    def fetch_batch(self, cursor, size):
+        return self._run_loader_step(lambda: cursor.fetchmany(size))
+
+    def close_loader(self, cursor):
+        self._run_loader_step(cursor.close)
+
+    def get_row_count(self, table, query, params):
+        key = (table, query, tuple(params))
+        if key in self.count_cache:
+            return self.count_cache[key], True
+        try:
+            if not params:
+                self.cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+                row = self.cursor.fetchone()
+                if row and row[0] >= 0:
+                    return row[0], False
+            self.cursor.execute("EXPLAIN (FORMAT JSON) " + query, params)
+            return int(self.cursor.fetchone()[0][0]["Plan"]["Plan Rows"]), False
+        except psycopg2.Error as e:
+            self.connection.rollback()
+            messagebox.showerror("Ошибка запроса", f"Ошибка при подсчете записей в таблице {table}:\n{str(e)}")
+            return None, False
+
+    def count_rows(self, table, query, params):
+        key = (table, query, tuple(params))
+        if key in self.count_cache:
+            return self.count_cache[key]
+        try:
+            self.cursor.execute(f"SELECT COUNT(*) FROM ({query}) AS counted", params)
+            self.count_cache[key] = self.cursor.fetchone()[0]
+            return self.count_cache[key]
+        except psycopg2.Error as e:
+            self.connection.rollback()
+            messagebox.showerror("Ошибка запроса", f"Ошибка при подсчете записей в таблице {table}:\n{str(e)}")
+            return None
+
+    def cache_row_count(self, table, query, params, count):
+        self.count_cache[(table, query, tuple(params))] = count
+
+    def clear_cached_counts(self, table):
+        for key in [key for key in self.count_cache if key[0] == table]:
+            del self.count_cache[key]
+
     def get_lookup_data_reverse(self, table, display_columns):
+        key = (table, display_columns)
+        if key in self.lookup_cache:
+            return self.lookup_cache[key]
         try:
             self.cursor.execute(f"SELECT {display_columns}, id FROM {table}")
-            return {str(row[0]): row[1] for row in self.cursor.fetchall()}
+            rows = [(str(row[0]), row[1]) for row in self.cursor.fetchall()]
+            self.lookup_cache[key] = {label: record_id for label, record_id in rows}
+            self.label_cache[key] = {record_id: label for label, record_id in rows}
+            return self.lookup_cache[key]
         except Exception as e:
             messagebox.showerror("Ошибка справочника", f"Ошибка при получении данных из справочника {table}:\n{str(e)}")
             return {}
 
+    @staticmethod
+    def mail_item_label(item_id, status, full_name):
+        return f"Отправление №{item_id} [{status}] ({full_name})"
+
     def get_mail_items_for_parcels(self):
+        key = ("mail_items", "parcel_label")
+        if key in self.lookup_cache:
+            return self.lookup_cache[key]
         try:
             self.cursor.execute("""
                 SELECT mi.id, mi.status, r.full_name 
                 FROM mail_items mi
                 JOIN recipients r ON mi.recipient_id = r.id
             """)
-            return {f"Отправление №{row[0]} [{row[1]}] ({row[2]})": row[0] for row in self.cursor.fetchall()}
+            rows = [(self.mail_item_label(*row), row[0]) for row in self.cursor.fetchall()]
+            self.lookup_cache[key] = {label: record_id for label, record_id in rows}
+            self.label_cache[key] = {record_id: label for label, record_id in rows}
+            return self.lookup_cache[key]
         except Exception as e:
             messagebox.showerror("Ошибка справочника", f"Ошибка при получении отправлений:\n{str(e)}")
             return {}
 
+    def get_lookup_labels(self, table, display_columns):
+        self.get_lookup_data_reverse(table, display_columns)
+        return self.label_cache.get((table, display_columns), {})
+
+    def get_mail_item_labels(self):
+        self.get_mail_items_for_parcels()
+        return self.label_cache.get(("mail_items", "parcel_label"), {})
+
+    def clear_lookup_cache(self):
+        self.lookup_cache.clear()
+        self.label_cache.clear()
+
+    def get_record_with_labels(self, table, record_id):
+        if table == "mail_items":
+            query = """
+                SELECT mi.*, mt.type_name, r.full_name, e.full_name
+                FROM mail_items mi
+                LEFT JOIN mail_types mt ON mi.mail_type_id = mt.id
+                LEFT JOIN recipients r ON mi.recipient_id = r.id
+                LEFT JOIN employees e ON mi.accepted_by = e.id
+                WHERE mi.id = %s
+            """
+            label_columns = ["mail_type_id", "recipient_id", "accepted_by"]
+        elif table == "parcels":
+            query = """
+                SELECT p.*, mi.id, mi.status, r.full_name
+                FROM parcels p
+                LEFT JOIN mail_items mi ON p.mail_item_id = mi.id
+                LEFT JOIN recipients r ON mi.recipient_id = r.id
+                WHERE p.id = %s
+            """
+            label_columns = ["mail_item_id", "mail_item_status", "mail_item_recipient"]
+        else:
+            query = f"SELECT * FROM {table} WHERE id = %s"
+            label_columns = []
+        
+        self.cursor.execute(query, (record_id,))
+        row = self.cursor.fetchone()
+        if row is None:
+            raise ValueError("Запись не найдена")
+        colnames = [desc[0] for desc in self.cursor.description][:len(row) - len(label_columns)]
+        record = dict(zip(colnames, row))
+        labels = dict(zip(label_columns, row[len(colnames):]))
+        
+        if table == "parcels":
+            item_id = labels.pop("mail_item_id")
+            status = labels.pop("mail_item_status")
+            full_name = labels.pop("mail_item_recipient")
+            labels["mail_item_id"] = self.mail_item_label(item_id, status, full_name) if item_id is not None else None
+        return record, labels
+
     def insert_data(self, table, data):
         try:
             columns = list(data.keys())
@@ -65,6 +202,8 @@ class Database:
             )
             self.cursor.execute(query, values)
             self.connection.commit()
+            self.count_cache.clear()
+            self.clear_lookup_cache()
             return self.cursor.fetchone()[0]
         except psycopg2.errors.ForeignKeyViolation:
             self.connection.rollback()
@@ -89,6 +228,8 @@ class Database:
             )
             self.cursor.execute(query, {**data, "record_id": record_id})
             self.connection.commit()
+            self.count_cache.clear()
+            self.clear_lookup_cache()
         except psycopg2.errors.ForeignKeyViolation:
             self.connection.rollback()
             raise ValueError("Некорректное значение для внешнего ключа")
@@ -108,6 +249,8 @@ class Database:
             )
             self.cursor.execute(query, (record_id,))
             self.connection.commit()
+            self.count_cache.clear()
+            self.clear_lookup_cache()
         except psycopg2.errors.ForeignKeyViolation:
             self.connection.rollback()
             raise ValueError("Невозможно удалить запись, так как на нее ссылаются другие таблицы")
@@ -132,6 +275,9 @@ class MainApp:
         self.filters = {}
         self.sort_columns = {}
         self.sort_direction = {}
+        self.loaders = {}
+        self.loaded_rows = {}
+        self.row_counts = {}
 
         self.notebook = ttk.Notebook(root)
         self.notebook.pack(fill='both', expand=True)
@@ -139,6 +285,7 @@ class MainApp:
         self.tabs = {}
         self.trees = {}
         self.filters_frame = {}
+        self.status_labels = {}
         
         tables = [
             ("mail_types", "Типы отправлений"),
@@ -184,7 +331,13 @@ class MainApp:
         ttk.Button(button_frame, text="Сбросить фильтры", 
                   command=lambda: self.reset_filters(table)).pack(side='right', padx=5)
         ttk.Button(button_frame, text="Обновить", 
-                  command=lambda: self.load_table_data(table)).pack(side='right', padx=5)
+                  command=lambda: self.refresh_table(table)).pack(side='right', padx=5)
+        ttk.Button(button_frame, text="Остановить", 
+                  command=lambda: self.stop_loading(table, True)).pack(side='right', padx=5)
+        
+        status_label = ttk.Label(button_frame, text="")
+        status_label.pack(side='left', padx=15)
+        self.status_labels[table] = status_label
         
         self.configure_columns(table)
         tree.bind("<<TreeviewSelect>>", self.on_tree_select)
@@ -369,12 +522,31 @@ class MainApp:
         base_text = russian_headers[table].get(column, column)
         tree.heading(column, text=base_text + (" ▼" if direction == "DESC" else " ▲"))
 
+    def refresh_table(self, table):
+        self.db.clear_cached_counts(table)
+        self.db.clear_lookup_cache()
+        self.load_table_data(table)
+
+    def parse_number_filter(self, widget, label, errors):
+        value = widget.get().strip()
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            errors.append(f"Некорректное числовое значение для '{label}'")
+            return None
+
     def load_table_data(self, table):
+        self.stop_loading(table)
         tree = self.trees[table]
         tree.delete(*tree.get_children())
+        self.loaded_rows[table] = 0
+        self.status_labels[table].config(text="")
         
         where_clauses = []
         params = []
+        errors = []
         
         search_text = self.filters[table]["search"].get()
         if search_text:
@@ -396,16 +568,16 @@ class MainApp:
         
         if table == "mail_items":
             status = self.filters[table]["status"].get()
-            weight_from = self.filters[table]["weight_from"].get()
-            weight_to = self.filters[table]["weight_to"].get()
+            weight_from = self.parse_number_filter(self.filters[table]["weight_from"], "Вес от", errors)
+            weight_to = self.parse_number_filter(self.filters[table]["weight_to"], "Вес до", errors)
             
             if status != "все":
                 where_clauses.append("status = %s")
                 params.append(status)
-            if weight_from:
+            if weight_from is not None:
                 where_clauses.append("weight >= %s")
                 params.append(weight_from)
-            if weight_to:
+            if weight_to is not None:
                 where_clauses.append("weight <= %s")
                 params.append(weight_to)
             
@@ -418,13 +590,13 @@ class MainApp:
             """
             
         elif table == "parcels":
-            value_from = self.filters[table]["value_from"].get()
-            value_to = self.filters[table]["value_to"].get()
+            value_from = self.parse_number_filter(self.filters[table]["value_from"], "Стоимость от", errors)
+            value_to = self.parse_number_filter(self.filters[table]["value_to"], "Стоимость до", errors)
             
-            if value_from:
+            if value_from is not None:
                 where_clauses.append("value >= %s")
                 params.append(value_from)
-            if value_to:
+            if value_to is not None:
                 where_clauses.append("value <= %s")
                 params.append(value_to)
             
@@ -440,18 +612,96 @@ class MainApp:
         else:
             query = f"SELECT * FROM {table}"
         
+        if errors:
+            messagebox.showerror("Ошибки ввода", "\n".join(errors))
+            return
+        
         if where_clauses:
             query += " WHERE " + " AND ".join(where_clauses)
         
+        self.row_counts[table] = self.db.get_row_count(table, query, params)
+        
+        order_by = ""
         if table in self.sort_columns and self.sort_columns[table]:
-            query += f" ORDER BY {self.sort_columns[table]}"
+            order_by = f" ORDER BY {self.sort_columns[table]}"
+        
+        try:
+            cursor = self.db.open_loader(f"load_{table}", query + order_by, params)
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Ошибка при загрузке данных из {table}: {str(e)}")
+            return
+        
+        self.loaders[table] = cursor
+        self.load_next_batch(table, cursor, query, params)
+
+    def load_next_batch(self, table, cursor, query, params):
+        if self.loaders.get(table) is not cursor:
+            return
         
         try:
-            self.db.cursor.execute(query, params)
-            for row in self.db.cursor.fetchall():
-                tree.insert("", tk.END, values=row)
+            rows = self.db.fetch_batch(cursor, LOAD_BATCH_SIZE)
         except Exception as e:
+            self.stop_loading(table)
+            tree = self.trees[table]
+            tree.delete(*tree.get_children())
+            self.loaded_rows[table] = 0
+            self.status_labels[table].config(text="")
             messagebox.showerror("Ошибка", f"Ошибка при загрузке данных из {table}: {str(e)}")
+            return
+        
+        tree = self.trees[table]
+        for row in rows:
+            tree.insert("", tk.END, values=row)
+        first_batch = self.loaded_rows[table] == 0
+        self.loaded_rows[table] += len(rows)
+        
+        if len(rows) < LOAD_BATCH_SIZE:
+            self.stop_loading(table)
+            self.db.cache_row_count(table, query, params, self.loaded_rows[table])
+            self.row_counts[table] = (self.loaded_rows[table], True)
+            self.update_status(table)
+            return
+        
+        self.update_status(table)
+        count, exact = self.row_counts[table]
+        if first_batch and not exact and (count is None or count <= EXACT_COUNT_LIMIT):
+            self.root.after(1, lambda: self.load_exact_count(table, cursor, query, params))
+        self.root.after(1, lambda: self.load_next_batch(table, cursor, query, params))
+
+    def load_exact_count(self, table, cursor, query, params):
+        if self.loaders.get(table) is not cursor:
+            return
+        count = self.db.count_rows(table, query, params)
+        if count is not None:
+            self.row_counts[table] = (count, True)
+            self.update_status(table)
+
+    def stop_loading(self, table, by_user=False):
+        cursor = self.loaders.pop(table, None)
+        if cursor is None:
+            return
+        try:
+            self.db.close_loader(cursor)
+        except psycopg2.Error:
+            pass
+        if not self.loaders:
+            self.db.load_connection.commit()
+        if by_user:
+            self.update_status(table, stopped=True)
+
+    def update_status(self, table, stopped=False):
+        loaded = self.loaded_rows.get(table, 0)
+        count, exact = self.row_counts.get(table, (None, False))
+        
+        if table not in self.loaders and not stopped:
+            text = f"Записей: {loaded}"
+        elif count is None:
+            text = f"Загружено {loaded}"
+        else:
+            text = f"Загружено {loaded} из {'' if exact else '~'}{max(count, loaded)}"
+        if stopped:
+            text += " (остановлено)"
+        self.status_labels[table].config(text=text)
 
     def on_tree_select(self, event):
         tree = event.widget
@@ -481,6 +731,7 @@ class MainApp:
         
         fields = {}
         lookup_data = {}
+        label_maps = {}
         
         if table == "mail_types":
             fields = {
@@ -522,6 +773,12 @@ class MainApp:
                 "recipient_id": recipients,
                 "accepted_by": employees
             }
+            
+            label_maps = {
+                "mail_type_id": self.db.get_lookup_labels("mail_types", "type_name"),
+                "recipient_id": self.db.get_lookup_labels("recipients", "full_name"),
+                "accepted_by": self.db.get_lookup_labels("employees", "full_name")
+            }
                     
         elif table == "parcels":
             mail_items = self.db.get_mail_items_for_parcels()
@@ -533,6 +790,7 @@ class MainApp:
             }
             
             lookup_data = {"mail_item_id": mail_items}
+            label_maps = {"mail_item_id": self.db.get_mail_item_labels()}
         
         entries = {}
         for field_name, field_config in fields.items():
@@ -555,26 +813,23 @@ class MainApp:
         
         if edit_mode:
             try:
-                self.db.cursor.execute(f"SELECT * FROM {table} WHERE id = %s", (self.current_record_id,))
-                record = self.db.cursor.fetchone()
-                colnames = [desc[0] for desc in self.db.cursor.description]
+                record, labels = self.db.get_record_with_labels(table, self.current_record_id)
                 
-                for i, colname in enumerate(colnames):
+                for colname, value in record.items():
                     if colname in entries:
-                        value = record[i]
                         if value is None:
                             continue
                             
                         if isinstance(entries[colname], ttk.Combobox):
-                            if colname in lookup_data:
-                                if table == "mail_items" and colname == "status":
-                                    entries[colname].set(value)
+                            if colname in labels:
+                                label = label_maps[colname].get(value, labels[colname])
+                                if label is None:
                                     continue
-                                    
-                                for display_value, id_value in lookup_data[colname].items():
-                                    if id_value == value:
-                                        entries[colname].set(display_value)
-                                        break
+                                if label not in lookup_data[colname]:
+                                    lookup_data[colname] = {**lookup_data[colname], label: value}
+                                    entries[colname]["values"] = list(lookup_data[colname].keys())
+                                if lookup_data[colname][label] == value:
+                                    entries[colname].set(label)
                             else:
                                 entries[colname].set(str(value))
                         else: